@@ -11,25 +11,85 @@ import socket
 import sys
 import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
-import requests
-
 from pmgmt_agent.package_managers import get_package_manager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.handlers.SysLogHandler(address='/dev/log')
-    ]
-)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_PATH = "/etc/pmgmt-agent/pmgmt-agent.conf"
+SYSLOG_ADDRESS = "/dev/log"
+
+
+def _configure_logging():
+    """Configure logging to stderr and, when available, to syslog."""
+    handlers = [logging.StreamHandler()]
+    
+    # Since Python 3.11 SysLogHandler no longer raises when the socket is
+    # missing but fails on every emit, so check for it up front
+    if os.path.exists(SYSLOG_ADDRESS):
+        try:
+            from logging.handlers import SysLogHandler
+            handlers.append(SysLogHandler(address=SYSLOG_ADDRESS))
+        except OSError:
+            pass
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def _dumps(data: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize data to JSON, using orjson when it is installed.
+    
+    Args:
+        data (Any): Data to serialize.
+        pretty (bool): Indent the output instead of using compact separators.
+        
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    
+    if pretty:
+        return json.dumps(data, indent=2).encode()
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+@lru_cache(maxsize=1)
+def _get_http(urllib3: Any) -> Any:
+    """
+    Get the shared HTTP connection pool, creating it on first use.
+    
+    The pool keeps connections alive and reuses them across requests.
+    
+    Args:
+        urllib3 (module): The urllib3 module, which send_to_api imports lazily.
+        
+    Returns:
+        urllib3.PoolManager: The shared connection pool.
+    """
+    return urllib3.PoolManager(
+        num_pools=2,
+        maxsize=4,
+        retries=urllib3.Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(["POST"])
+        ),
+        timeout=urllib3.Timeout(connect=5, read=30)
+    )
 
 
 def parse_args():
@@ -63,6 +123,33 @@ def parse_args():
         help="Override hostname from config file"
     )
     
+    details_group = parser.add_mutually_exclusive_group()
+    details_group.add_argument(
+        "--details",
+        action="store_true",
+        default=None,
+        help="Query additional package details (size, maintainer, description); "
+             "the default unless --send-to-api is given"
+    )
+    details_group.add_argument(
+        "--no-details",
+        action="store_false",
+        dest="details",
+        help="Skip querying additional package details"
+    )
+    
+    parser.add_argument(
+        "--no-security",
+        action="store_true",
+        help="Skip determining which updates are security updates"
+    )
+    
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Pretty-print JSON output with indentation"
+    )
+    
     return parser.parse_args()
 
 
@@ -91,11 +178,11 @@ def load_config(config_path: str) -> configparser.ConfigParser:
     if os.path.exists(config_path):
         try:
             config.read(config_path)
-            logger.info(f"Loaded configuration from {config_path}")
+            logger.info("Loaded configuration from %s", config_path)
         except Exception as e:
-            logger.error(f"Error loading configuration from {config_path}: {e}")
+            logger.error("Error loading configuration from %s: %s", config_path, e)
     else:
-        logger.warning(f"Configuration file {config_path} not found, using defaults")
+        logger.warning("Configuration file %s not found, using defaults", config_path)
     
     return config
 
@@ -134,34 +221,47 @@ def send_to_api(data: Dict[str, Any], api_url: str, api_key: str) -> bool:
     Returns:
         bool: True if successful, False otherwise.
     """
+    # Only imported here so runs that don't talk to the API don't pay for it
+    import urllib3
+    
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
     
     try:
-        logger.info(f"Sending data to API: {api_url}")
-        response = requests.post(api_url, json=data, headers=headers, timeout=30)
+        logger.info("Sending data to API: %s", api_url)
+        response = _get_http(urllib3).request("POST", api_url, body=_dumps(data), headers=headers)
         
-        if response.status_code == 200:
+        if response.status == 200:
             logger.info("Data successfully sent to API")
             return True
         else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
+            logger.error(
+                "API request failed with status code %s: %s",
+                response.status, response.data.decode(errors="replace")
+            )
             return False
             
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error sending data to API: {e}")
+    except urllib3.exceptions.HTTPError as e:
+        logger.error("Error sending data to API: %s", e)
         return False
 
 
 def main():
     """Main entry point for the CLI."""
+    _configure_logging()
     args = parse_args()
     config = load_config(args.config)
     
     # Get package manager
-    package_manager = get_package_manager()
+    # Details are left out of API payloads unless explicitly requested
+    fetch_details = args.details if args.details is not None else not args.send_to_api
+    
+    package_manager = get_package_manager(
+        fetch_details=fetch_details,
+        check_security=not args.no_security
+    )
     if not package_manager:
         logger.error("No supported package manager found")
         sys.exit(1)
@@ -182,9 +282,12 @@ def main():
         "distribution": distribution_info,
         "updates": updates,
         "total_updates": len(updates),
-        "security_updates": sum(1 for update in updates if update.get("is_security_update", False))
     }
     
+    # Without security classification there is no count to report
+    if not args.no_security:
+        output_data["security_updates"] = sum(1 for update in updates if update.get("is_security_update", False))
+    
     # Determine if we should send to API
     send_to_api_flag = args.send_to_api
     
@@ -206,8 +309,9 @@ def main():
         if not success:
             sys.exit(1)
     else:
-        # Output to stdout
-        print(json.dumps(output_data, indent=2))
+        # Output to stdout, compact unless --pretty was given
+        sys.stdout.buffer.write(_dumps(output_data, pretty=args.pretty))
+        sys.stdout.buffer.write(b"\n")
     
     sys.exit(0)
 
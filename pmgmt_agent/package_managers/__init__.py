@@ -2,33 +2,35 @@
 Package manager detection and implementation.
 """
 
-import distro
 import logging
 from typing import Optional
 
-from .base import PackageManager
+from .base import PackageManager, distro_info
 from .apt import AptPackageManager
 from .dnf import DnfPackageManager
 
 logger = logging.getLogger(__name__)
 
-def get_package_manager() -> Optional[PackageManager]:
+def get_package_manager(**kwargs) -> Optional[PackageManager]:
     """
     Detect the current Linux distribution and return the appropriate package manager.
     
+    Args:
+        **kwargs: Options passed on to the package manager constructor.
+        
     Returns:
         PackageManager: An instance of the appropriate package manager class.
         None: If no supported package manager is found.
     """
-    distribution = distro.id().lower()
-    logger.info(f"Detected Linux distribution: {distribution}")
+    distribution = distro_info()["id"].lower()
+    logger.info("Detected Linux distribution: %s", distribution)
     
     if distribution in ["ubuntu", "debian"]:
         logger.info("Using APT package manager")
-        return AptPackageManager()
+        return AptPackageManager(**kwargs)
     elif distribution in ["fedora"]:
         logger.info("Using DNF package manager")
-        return DnfPackageManager()
+        return DnfPackageManager(**kwargs)
     else:
-        logger.error(f"Unsupported Linux distribution: {distribution}")
+        logger.error("Unsupported Linux distribution: %s", distribution)
         return None
\ No newline at end of file
@@ -2,21 +2,86 @@
 APT package manager implementation.
 """
 
+import glob
+import gzip
+import lzma
+import os
+import re
 import subprocess
 import logging
-import distro
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set
 
-from .base import PackageManager
+from .base import PackageManager, QUERY_TIMEOUT, distro_info, run_lines
 
 logger = logging.getLogger(__name__)
 
+# Matches a line of `apt list --upgradable` output
+_APT_LINE_RE = re.compile(
+    r'^(?P<name>[^/]+)/\S+\s+(?P<ver>\S+)\s+(?P<arch>\S+)\s+\[upgradable from:\s+(?P<old>[^\]]+)\]'
+)
+
+# Matches the fields of an `apt-cache show` stanza that are reported
+_APT_FIELD_RE = re.compile(r'(?m)^(Size|Homepage|Maintainer|Section|Priority|Description): (.*)$')
+
+# Matches an "Inst" line of `apt-get -s dist-upgrade` output, e.g.
+# Inst libssl3 [3.0.2-0ubuntu1.9] (3.0.2-0ubuntu1.10 Ubuntu:22.04/jammy-security [amd64])
+_APT_INST_RE = re.compile(
+    r'^Inst (?P<name>\S+) (?:\[[^\]]*\] )?\((?P<ver>\S+) (?P<origins>[^)]*)\)'
+)
+
+APT_LISTS_DIR = "/var/lib/apt/lists"
+
+# Openers for the (possibly compressed) Packages index files, by file suffix
+_LIST_OPENERS = {
+    "_Packages": open,
+    "_Packages.gz": gzip.open,
+    "_Packages.xz": lzma.open,
+}
+
+
+def _import_python_apt() -> Any:
+    """
+    Import the python-apt bindings if they are installed.
+    
+    Returns:
+        module: The apt module, or None if it is not available.
+    """
+    try:
+        import apt
+    except ImportError:
+        return None
+    return apt
+
 
 class AptPackageManager(PackageManager):
     """
     Implementation of the APT package manager for Debian-based distributions.
+    
+    Uses the python-apt bindings when they are installed and falls back to
+    running the APT command-line tools otherwise.
     """
     
+    def __init__(self, **kwargs):
+        """
+        Initialize the APT package manager.
+        
+        Args:
+            **kwargs: Options passed on to PackageManager.
+        """
+        super().__init__(**kwargs)
+        
+        # Query results, remembered for the lifetime of this instance
+        self._details_cache: Dict[str, Dict[str, Any]] = {}
+        self._security_pkgs: Optional[Set[str]] = None
+        
+        self._cache = None
+        python_apt = _import_python_apt()
+        if python_apt is not None:
+            try:
+                self._cache = python_apt.Cache()
+            except Exception as e:
+                logger.warning("Error opening APT cache, falling back to APT commands: %s", e)
+    
     def get_distribution_info(self) -> Dict[str, str]:
         """
         Get information about the current Debian-based distribution.
@@ -25,10 +90,7 @@ class AptPackageManager(PackageManager):
             Dict[str, str]: A dictionary containing distribution information.
         """
         return {
-            "id": distro.id(),
-            "version": distro.version(),
-            "codename": distro.codename(),
-            "name": distro.name(),
+            **distro_info(),
             "package_manager": "apt"
         }
     
@@ -42,115 +104,262 @@ class AptPackageManager(PackageManager):
         """
         logger.info("Checking for available updates with APT")
         
+        if self._cache is not None:
+            return self._get_available_updates_from_cache()
+        
         try:
             # Get list of upgradable packages
             cmd = ["apt", "list", "--upgradable"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            lines = run_lines(cmd, timeout=QUERY_TIMEOUT)
             
-            # Parse the output
-            updates = []
-            lines = result.stdout.strip().split('\n')
+            # Parse the output as it is produced
+            parsed = []
             
             # Skip the first line (header)
-            for line in lines[1:]:
+            next(lines, None)
+            for line in lines:
                 if not line.strip():
                     continue
                 
-                try:
-                    # Format is typically: package/source,now version arch [upgradable from: old-version]
-                    parts = line.split()
-                    if len(parts) < 4:
-                        continue
-                    
-                    package_info = parts[0].split('/')
-                    package_name = package_info[0]
-                    
-                    # Extract version
-                    version_info = line.split('[upgradable from: ')[1].rstrip(']')
-                    new_version = parts[1]
-                    
-                    # Get additional package information
-                    pkg_info = self._get_package_details(package_name)
-                    
-                    update_info = {
-                        "name": package_name,
-                        "version": new_version,
-                        "current_version": version_info,
-                        "architecture": parts[2] if len(parts) > 2 else "",
-                        "is_security_update": self._is_security_update(package_name),
-                    }
-                    
-                    # Add additional package details if available
-                    if pkg_info:
-                        update_info.update(pkg_info)
-                    
-                    updates.append(update_info)
-                    
-                except (IndexError, ValueError) as e:
-                    logger.warning(f"Failed to parse package line: {line}. Error: {e}")
+                # Format is typically: package/source,now version arch [upgradable from: old-version]
+                match = _APT_LINE_RE.match(line)
+                if not match:
+                    logger.warning("Failed to parse package line: %s", line.rstrip())
+                    continue
+                
+                parsed.append({
+                    "name": match["name"],
+                    "version": match["ver"],
+                    "current_version": match["old"],
+                    "architecture": match["arch"],
+                })
+            
+            if not parsed:
+                return []
+            
+            # Query details for all packages at once, reading the security
+            # indexes concurrently with the apt-cache call
+            package_names = list(dict.fromkeys(pkg["name"] for pkg in parsed))
+            details_by_pkg, security_pkgs = self._query_metadata(
+                lambda: self._get_packages_details(package_names),
+                self._get_security_updates
+            )
+            
+            updates = []
+            for update_info in parsed:
+                package_name = update_info["name"]
+                if self.check_security:
+                    update_info["is_security_update"] = package_name in security_pkgs
+                
+                # Add additional package details if available
+                pkg_info = details_by_pkg.get(package_name)
+                if pkg_info:
+                    update_info.update(pkg_info)
+                
+                updates.append(update_info)
             
             return updates
             
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Error running APT command: {e}")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.error("Error running APT command: %s", e)
             return []
     
-    def _get_package_details(self, package_name: str) -> Dict[str, Any]:
+    def _get_available_updates_from_cache(self) -> List[Dict[str, Any]]:
+        """
+        Get a list of available package updates from the python-apt cache.
+        
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries, each containing information
+                                 about an available package update.
+        """
+        updates = []
+        
+        for pkg in self._cache:
+            if not pkg.is_upgradable:
+                continue
+            
+            candidate = pkg.candidate
+            update_info = {
+                "name": pkg.shortname,
+                "version": candidate.version,
+                "current_version": pkg.installed.version,
+                "architecture": candidate.architecture,
+            }
+            
+            if self.check_security:
+                update_info["is_security_update"] = any(
+                    "security" in origin.archive for origin in candidate.origins
+                )
+            
+            if self.fetch_details:
+                details = {
+                    "size_bytes": candidate.size,
+                    "website": candidate.homepage,
+                    "maintainer": candidate.record.get("Maintainer"),
+                    "section": candidate.section,
+                    "priority": candidate.priority,
+                    "description": candidate.summary,
+                }
+                update_info.update((key, value) for key, value in details.items() if value)
+            
+            updates.append(update_info)
+        
+        return updates
+    
+    def _get_packages_details(self, package_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get detailed information about several packages, querying apt-cache
+        only for packages that haven't been looked up yet.
+        
+        Args:
+            package_names (List[str]): The names of the packages.
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Package details keyed by package name.
+        """
+        missing = [name for name in package_names if name not in self._details_cache]
+        if missing:
+            details_by_pkg = self._query_packages_details(missing)
+            self._details_cache.update(details_by_pkg)
+        
+        return {name: self._details_cache[name] for name in package_names if name in self._details_cache}
+    
+    def _query_packages_details(self, package_names: List[str]) -> Dict[str, Dict[str, Any]]:
         """
-        Get detailed information about a specific package.
+        Get detailed information about several packages with a single apt-cache call.
         
         Args:
-            package_name (str): The name of the package.
+            package_names (List[str]): The names of the packages.
             
         Returns:
-            Dict[str, Any]: A dictionary containing package details.
+            Dict[str, Dict[str, Any]]: Package details keyed by package name.
         """
+        # apt-cache exits non-zero if any package is unknown but still
+        # prints the stanzas it found, so don't use check=True here
+        cmd = ["apt-cache", "show", *package_names]
         try:
-            cmd = ["apt-cache", "show", package_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=QUERY_TIMEOUT)
+        except subprocess.TimeoutExpired as e:
+            logger.warning("Timed out running apt-cache show: %s", e)
+            return {}
+        if result.returncode != 0:
+            logger.warning("apt-cache show exited with code %s: %s", result.returncode, result.stderr.strip())
+        
+        details_by_pkg = {}
+        
+        # Each package version is a stanza separated by a blank line; the
+        # first stanza for a package is the newest (candidate) version
+        for stanza in result.stdout.split('\n\n'):
+            first_line, _, fields = stanza.lstrip('\n').partition('\n')
+            if not first_line.startswith("Package: "):
+                continue
             
-            details = {}
-            lines = result.stdout.strip().split('\n')
+            package_name = first_line[9:].strip()
+            if package_name in details_by_pkg:
+                continue
             
-            for line in lines:
-                if not line or ': ' not in line:
-                    continue
-                
-                key, value = line.split(': ', 1)
-                key = key.lower().replace('-', '_')
+            details = {}
+            for match in _APT_FIELD_RE.finditer(fields):
+                key, value = match.groups()
                 
-                if key == "size":
+                if key == "Size":
                     try:
                         details["size_bytes"] = int(value)
                     except ValueError:
                         details["size"] = value
-                elif key == "homepage":
+                elif key == "Homepage":
                     details["website"] = value
-                elif key in ["maintainer", "section", "priority", "description"]:
-                    details[key] = value
-            
-            return details
+                else:
+                    details[key.lower()] = value
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Error getting details for package {package_name}: {e}")
-            return {}
+            details_by_pkg[package_name] = details
+        
+        return details_by_pkg
     
-    def _is_security_update(self, package_name: str) -> bool:
+    def _get_security_updates(self) -> Set[str]:
         """
-        Determine if a package update is a security update.
+        Get the names of all packages whose upgrade comes from a security
+        repository, classifying them only the first time.
+        
+        Falls back to scanning the security repository indexes if the
+        upgrade simulation cannot be run.
         
-        Args:
-            package_name (str): The name of the package.
-            
         Returns:
-            bool: True if the update is a security update, False otherwise.
+            Set[str]: The names of the packages with security updates.
         """
+        if self._security_pkgs is not None:
+            return self._security_pkgs
+        
         try:
-            # Check if the package is from a security repository
-            cmd = ["apt-cache", "policy", package_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            return "security" in result.stdout.lower()
+            self._security_pkgs = self._build_security_set()
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.warning("Error simulating upgrade, falling back to APT lists: %s", e)
+            self._security_pkgs = _read_security_packages()
+        
+        return self._security_pkgs
+    
+    def _build_security_set(self) -> Set[str]:
+        """
+        Classify all pending upgrades with a single simulated dist-upgrade.
+        
+        Returns:
+            Set[str]: The names of the packages whose candidate version is
+                      from a security suite.
             
-        except subprocess.CalledProcessError:
-            return False
\ No newline at end of file
+        Raises:
+            subprocess.CalledProcessError: If apt-get fails.
+            subprocess.TimeoutExpired: If apt-get runs longer than QUERY_TIMEOUT.
+        """
+        # apt list --upgradable also lists held packages and phased updates,
+        # so include them in the simulation as well
+        cmd = [
+            "apt-get", "-s",
+            "-o", "Debug::NoLocking=1",
+            "-o", "APT::Ignore-Hold=true",
+            "-o", "APT::Get::Always-Include-Phased-Updates=true",
+            "dist-upgrade",
+        ]
+        security_pkgs = set()
+        
+        for line in run_lines(cmd, timeout=QUERY_TIMEOUT):
+            match = _APT_INST_RE.match(line)
+            if match and "security" in match["origins"]:
+                # Foreign architecture packages are listed as name:arch
+                security_pkgs.add(match["name"].split(':', 1)[0])
+        
+        return security_pkgs
+
+
+def _security_list_files() -> List[str]:
+    """
+    Find the package index files of all configured security repositories.
+    
+    Returns:
+        List[str]: Paths to the security Packages index files.
+    """
+    pattern = os.path.join(APT_LISTS_DIR, "*security*_Packages*")
+    return sorted(
+        path for path in glob.glob(pattern)
+        if path.endswith(tuple(_LIST_OPENERS))
+    )
+
+
+def _read_security_packages() -> Set[str]:
+    """
+    Read the package names listed in the security repository indexes.
+    
+    Returns:
+        Set[str]: The names of the packages in the security repository indexes.
+    """
+    security_pkgs = set()
+    for path in _security_list_files():
+        opener = next(opener for suffix, opener in _LIST_OPENERS.items() if path.endswith(suffix))
+        try:
+            with opener(path, "rb") as f:
+                for line in f:
+                    if line.startswith(b"Package: "):
+                        security_pkgs.add(line[9:].strip().decode())
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            logger.warning("Error reading APT list %s: %s", path, e)
+    
+    return security_pkgs
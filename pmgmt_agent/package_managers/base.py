@@ -2,8 +2,88 @@
 Base class for package managers.
 """
 
+import subprocess
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
+
+# Upper bound (in seconds) for a bulk package metadata query covering all packages
+QUERY_TIMEOUT = 120
+
+
+@lru_cache(maxsize=1)
+def distro_info() -> Dict[str, str]:
+    """
+    Get information about the current distribution.
+    
+    The result is cached since the underlying os-release data does not
+    change while the agent runs.
+    
+    Returns:
+        Dict[str, str]: A dictionary containing the distribution id, version,
+                        codename and name.
+    """
+    import distro
+    
+    return {
+        "id": distro.id(),
+        "version": distro.version(),
+        "codename": distro.codename(),
+        "name": distro.name(),
+    }
+
+
+def run_lines(cmd: List[str], timeout: Optional[float] = None) -> Iterator[str]:
+    """
+    Run a command and yield its standard output line by line as it is produced.
+    
+    Unlike subprocess.run with capture_output, the output is never held in
+    memory as a whole and parsing can start while the command is still running.
+    
+    Args:
+        cmd (List[str]): The command to run.
+        timeout (Optional[float]): Kill the command if it runs longer than this
+                                   many seconds.
+        
+    Yields:
+        str: Lines of standard output, including the trailing newline.
+        
+    Raises:
+        subprocess.CalledProcessError: If the command exits with a non-zero status.
+        subprocess.TimeoutExpired: If the command was killed after the timeout.
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    timed_out = threading.Event()
+    
+    def _kill():
+        # The command may already have exited just before the timer fired
+        if process.poll() is None:
+            timed_out.set()
+            process.kill()
+    
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, _kill)
+        timer.start()
+    
+    try:
+        yield from process.stdout
+    except GeneratorExit:
+        # The caller stopped reading early, don't leave the command blocked on a full pipe
+        process.kill()
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        process.stdout.close()
+        returncode = process.wait()
+    
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
 
 
 class PackageManager(ABC):
@@ -11,6 +91,48 @@ class PackageManager(ABC):
     Abstract base class for package managers.
     """
     
+    def __init__(self, *, fetch_details: bool = False, check_security: bool = True):
+        """
+        Initialize the package manager.
+        
+        Args:
+            fetch_details (bool): Query additional details (size, maintainer,
+                                  description, ...) for each available update.
+            check_security (bool): Determine whether each available update is
+                                   a security update.
+        """
+        self.fetch_details = fetch_details
+        self.check_security = check_security
+    
+    def _query_metadata(
+        self,
+        get_details: Callable[[], Dict[str, Dict[str, Any]]],
+        get_security: Callable[[], Set[str]]
+    ) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Run the enabled package detail and security queries.
+        
+        When both are enabled they run concurrently so their subprocess
+        waits overlap.
+        
+        Args:
+            get_details (Callable): Returns package details keyed by package name.
+            get_security (Callable): Returns the names of packages with security updates.
+            
+        Returns:
+            Tuple[Dict[str, Dict[str, Any]], Set[str]]: The package details and
+                security update names, empty for disabled queries.
+        """
+        if self.fetch_details and self.check_security:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                details_future = executor.submit(get_details)
+                security_future = executor.submit(get_security)
+                return details_future.result(), security_future.result()
+        
+        details = get_details() if self.fetch_details else {}
+        security = get_security() if self.check_security else set()
+        return details, security
+    
     @abstractmethod
     def get_distribution_info(self) -> Dict[str, str]:
         """
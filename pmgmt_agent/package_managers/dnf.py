@@ -4,20 +4,55 @@ DNF package manager implementation.
 
 import subprocess
 import logging
-import distro
 import json
-from typing import Dict, List, Any
+import sys
+from typing import Dict, List, Any, Optional, Set
 
-from .base import PackageManager
+from .base import PackageManager, QUERY_TIMEOUT, distro_info, run_lines
 
 logger = logging.getLogger(__name__)
 
 
+def _import_dnf() -> Any:
+    """
+    Import the dnf Python API if it is installed.
+    
+    dnf pulls in libdnf, hawkey and rpm, so it is only imported once a
+    DNF package manager is actually created.
+    
+    Returns:
+        module: The dnf module, or None if it is not available.
+    """
+    try:
+        import dnf
+    except ImportError:
+        return None
+    return dnf
+
+
 class DnfPackageManager(PackageManager):
     """
     Implementation of the DNF package manager for Fedora-based distributions.
+    
+    Uses the dnf Python API when it is importable and falls back to running
+    the dnf command otherwise.
     """
     
+    def __init__(self, **kwargs):
+        """
+        Initialize the DNF package manager.
+        
+        Args:
+            **kwargs: Options passed on to PackageManager.
+        """
+        super().__init__(**kwargs)
+        
+        # Query results, remembered for the lifetime of this instance
+        self._details_cache: Dict[str, Dict[str, Any]] = {}
+        self._security_set: Optional[Set[str]] = None
+        
+        self._dnf = _import_dnf()
+    
     def get_distribution_info(self) -> Dict[str, str]:
         """
         Get information about the current Fedora-based distribution.
@@ -26,10 +61,7 @@ class DnfPackageManager(PackageManager):
             Dict[str, str]: A dictionary containing distribution information.
         """
         return {
-            "id": distro.id(),
-            "version": distro.version(),
-            "codename": distro.codename(),
-            "name": distro.name(),
+            **distro_info(),
             "package_manager": "dnf"
         }
     
@@ -43,70 +75,176 @@ class DnfPackageManager(PackageManager):
         """
         logger.info("Checking for available updates with DNF")
         
+        if self._dnf is not None:
+            try:
+                return self._get_available_updates_from_api()
+            except self._dnf.exceptions.Error as e:
+                logger.warning("Error querying DNF API, falling back to DNF commands: %s", e)
+        
         try:
             # Use DNF's JSON output for easier parsing
             cmd = ["dnf", "check-update", "--refresh", "--assumeno", "--quiet", "--json"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=QUERY_TIMEOUT)
             
             # DNF returns exit code 100 when updates are available
             if result.returncode not in [0, 100]:
-                logger.error(f"DNF command failed with exit code {result.returncode}")
+                logger.error("DNF command failed with exit code %s", result.returncode)
                 return []
             
             try:
                 # Parse JSON output
                 data = json.loads(result.stdout)
+                packages = data.get("updates", [])
+                
+                # Query details and security status for all packages at once,
+                # running both dnf calls concurrently
+                names = list(dict.fromkeys(pkg.get("name", "") for pkg in packages if pkg.get("name")))
+                details_by_name = {}
+                security_set = set()
+                if names:
+                    details_by_name, security_set = self._query_metadata(
+                        lambda: self._get_packages_details(names),
+                        self._get_security_updates
+                    )
+                
                 updates = []
                 
-                for pkg in data.get("updates", []):
+                for pkg in packages:
+                    name = pkg.get("name", "")
                     update_info = {
-                        "name": pkg.get("name", ""),
+                        "name": name,
                         "version": pkg.get("version", ""),
                         "release": pkg.get("release", ""),
-                        "architecture": pkg.get("arch", ""),
-                        "repository": pkg.get("repo", ""),
+                        # The same few architectures and repositories repeat
+                        # across all updates, so share a single copy of each
+                        "architecture": sys.intern(pkg.get("arch") or ""),
+                        "repository": sys.intern(pkg.get("repo") or ""),
                         "current_version": pkg.get("installed_version", ""),
+                        # Add additional package details
+                        **details_by_name.get(name, {}),
                     }
                     
-                    # Get additional package details
-                    pkg_info = self._get_package_details(pkg.get("name", ""))
-                    if pkg_info:
-                        update_info.update(pkg_info)
-                    
                     # Check if it's a security update
-                    update_info["is_security_update"] = self._is_security_update(pkg.get("name", ""))
+                    if self.check_security:
+                        update_info["is_security_update"] = name in security_set
                     
                     updates.append(update_info)
                 
                 return updates
                 
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse DNF JSON output: {e}")
+                logger.error("Failed to parse DNF JSON output: %s", e)
                 return []
                 
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Error running DNF command: {e}")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.error("Error running DNF command: %s", e)
             return []
     
-    def _get_package_details(self, package_name: str) -> Dict[str, Any]:
+    def _get_available_updates_from_api(self) -> List[Dict[str, Any]]:
+        """
+        Get a list of available package updates through the dnf Python API.
+        
+        Returns:
+            List[Dict[str, Any]]: A list of dictionaries, each containing information
+                                 about an available package update.
+                                 
+        Raises:
+            dnf.exceptions.Error: If the repositories or package sack cannot be loaded.
+        """
+        import hawkey
+        from dnf.cli.format import format_number
+        
+        with self._dnf.Base() as base:
+            # Honour /etc/dnf/dnf.conf (excludes, proxy, ...) and /etc/dnf/vars
+            # like the dnf command does
+            base.conf.read()
+            base.conf.substitutions.update_from_etc(base.conf.installroot, varsdir=base.conf.varsdir)
+            base.read_all_repos()
+            base.fill_sack(load_system_repo=True, load_available_repos=True)
+            
+            query = base.sack.query()
+            installed = query.installed()
+            upgrades = query.upgrades().latest()
+            
+            security_set = set()
+            if self.check_security:
+                # Like `dnf updateinfo list security`: security advisories
+                # fixed by a newer version than the one installed
+                for advisory_pkg in installed.latest().get_advisory_pkgs(hawkey.GT):
+                    if advisory_pkg.get_advisory(base.sack).type == hawkey.ADVISORY_SECURITY:
+                        security_set.add(advisory_pkg.name)
+            
+            updates = []
+            
+            for pkg in upgrades.run():
+                # Filter by arch too so multilib packages get their own installed
+                # version, and take the newest for installonly packages (kernel)
+                current = installed.filter(name=pkg.name, arch=pkg.arch).latest().run()
+                update_info = {
+                    "name": pkg.name,
+                    "version": pkg.version,
+                    "release": pkg.release,
+                    "architecture": sys.intern(pkg.arch),
+                    "repository": sys.intern(pkg.reponame),
+                    # Same format as `version`, without epoch or release
+                    "current_version": current[0].version if current else "",
+                }
+                
+                if self.fetch_details:
+                    details = {
+                        # Human-readable, as printed by `dnf info`
+                        "size": format_number(float(pkg.downloadsize)),
+                        "website": pkg.url,
+                        "license": pkg.license,
+                        "summary": pkg.summary,
+                        "description": pkg.description,
+                    }
+                    update_info.update((key, value) for key, value in details.items() if value)
+                
+                if self.check_security:
+                    update_info["is_security_update"] = pkg.name in security_set
+                
+                updates.append(update_info)
+            
+            return updates
+    
+    def _get_packages_details(self, package_names: List[str]) -> Dict[str, Dict[str, Any]]:
         """
-        Get detailed information about a specific package.
+        Get detailed information about several packages, querying dnf only
+        for packages that haven't been looked up yet.
         
         Args:
-            package_name (str): The name of the package.
+            package_names (List[str]): The names of the packages.
             
         Returns:
-            Dict[str, Any]: A dictionary containing package details.
+            Dict[str, Dict[str, Any]]: Package details keyed by package name.
         """
-        try:
-            cmd = ["dnf", "info", package_name, "--quiet"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            details = {}
-            lines = result.stdout.strip().split('\n')
-            current_key = None
+        missing = [name for name in package_names if name not in self._details_cache]
+        if missing:
+            details_by_name = self._query_packages_details(missing)
+            self._details_cache.update(details_by_name)
+        
+        return {name: self._details_cache[name] for name in package_names if name in self._details_cache}
+    
+    def _query_packages_details(self, package_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get detailed information about several packages with a single dnf call.
+        
+        Args:
+            package_names (List[str]): The names of the packages.
             
-            for line in lines:
+        Returns:
+            Dict[str, Dict[str, Any]]: Package details keyed by package name.
+        """
+        cmd = ["dnf", "info", "--quiet", *package_names]
+        details_by_name = {}
+        details = None
+        
+        # Parse each package stanza as it is streamed. Installed packages
+        # are listed before available upgrades, so later stanzas for the
+        # same name take precedence.
+        try:
+            for line in run_lines(cmd, timeout=QUERY_TIMEOUT):
                 if not line.strip():
                     continue
                 
@@ -115,36 +253,54 @@ class DnfPackageManager(PackageManager):
                     key = parts[0].strip().lower().replace(" ", "_")
                     value = parts[1].strip()
                     
-                    if key == "size":
+                    if key == "name":
+                        details = details_by_name.setdefault(value, {})
+                    elif details is None:
+                        continue
+                    elif key == "size":
                         details["size"] = value
                     elif key == "url":
                         details["website"] = value
                     elif key in ["license", "summary", "description"]:
                         details[key] = value
-                
-            return details
-            
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Error getting details for package {package_name}: {e}")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.warning("Error getting package details: %s", e)
             return {}
+        
+        return details_by_name
     
-    def _is_security_update(self, package_name: str) -> bool:
+    def _get_security_updates(self) -> Set[str]:
         """
-        Determine if a package update is a security update.
+        Get the names of all packages with pending security advisories,
+        querying dnf only the first time.
         
-        Args:
-            package_name (str): The name of the package.
-            
         Returns:
-            bool: True if the update is a security update, False otherwise.
+            Set[str]: The names of the packages with security updates.
+        """
+        if self._security_set is None:
+            self._security_set = self._query_security_updates()
+        return self._security_set
+    
+    def _query_security_updates(self) -> Set[str]:
         """
+        Get the names of all packages with pending security advisories.
+        
+        Returns:
+            Set[str]: The names of the packages with security updates.
+        """
+        cmd = ["dnf", "updateinfo", "list", "security", "--quiet"]
         try:
-            # Check if the package is from a security repository or has security advisories
-            cmd = ["dnf", "updateinfo", "list", "security", package_name]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # If the package is listed in security updates, the output will contain the package name
-            return package_name in result.stdout
-            
-        except subprocess.CalledProcessError:
-            return False
\ No newline at end of file
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=QUERY_TIMEOUT)
+        except subprocess.TimeoutExpired as e:
+            logger.warning("Timed out running DNF updateinfo: %s", e)
+            return set()
+        if result.returncode != 0:
+            logger.warning("DNF updateinfo command failed with exit code %s", result.returncode)
+            return set()
+        
+        # Lines look like: FEDORA-2023-abc123 Important/Sec. openssl-libs-1:3.0.9-2.fc38.x86_64
+        return {
+            line.split()[-1].rsplit('-', 2)[0]
+            for line in result.stdout.splitlines()
+            if line.strip()
+        }
@@ -6,9 +6,12 @@ setup(
     packages=find_packages(),
     install_requires=[
         "distro",  # For detecting Linux distribution
-        "requests",  # For API communication
+        "urllib3>=1.26",  # For API communication
         "configparser",  # For configuration file handling
     ],
+    extras_require={
+        "fast": ["orjson"],  # Faster JSON serialization
+    },
     entry_points={
         "console_scripts": [
             "pmgmt-agent=pmgmt_agent.cli:main",
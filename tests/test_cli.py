@@ -0,0 +1,213 @@
+"""
+Tests for the pmgmt-agent command-line interface.
+"""
+
+import io
+import json
+import logging
+import logging.handlers
+import os
+import socket
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import urllib3
+
+from pmgmt_agent import cli
+
+
+UPDATES = [
+    {"name": "libssl3", "version": "3.0.2-0ubuntu1.10", "is_security_update": True},
+    {"name": "tzdata", "version": "2023c-0ubuntu0.22.04.2", "is_security_update": False},
+]
+
+
+class StdoutBuffer(io.TextIOWrapper):
+    """A text stdout replacement whose bytes can be read back."""
+
+    def __init__(self):
+        super().__init__(io.BytesIO(), encoding="utf-8")
+
+    def getvalue(self):
+        self.flush()
+        return self.buffer.getvalue().decode()
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """Tests for logging setup."""
+
+    def configured_handlers(self, syslog_address):
+        """Return the handlers _configure_logging installs for a syslog address."""
+        with mock.patch.object(cli, "SYSLOG_ADDRESS", syslog_address), \
+                mock.patch.object(logging, "basicConfig") as basic_config:
+            cli._configure_logging()
+
+        handlers = basic_config.call_args[1]["handlers"]
+        for handler in handlers:
+            self.addCleanup(handler.close)
+        return handlers
+
+    def test_without_syslog(self):
+        """Test that only the stream handler is used without a syslog socket."""
+        handlers = self.configured_handlers("/nonexistent/dev/log")
+        self.assertEqual([type(handler) for handler in handlers], [logging.StreamHandler])
+
+    def test_with_syslog(self):
+        """Test that a syslog handler is added when the socket exists."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            address = os.path.join(tmpdir, "log")
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.addCleanup(sock.close)
+            sock.bind(address)
+
+            handlers = self.configured_handlers(address)
+
+        self.assertEqual(
+            [type(handler) for handler in handlers],
+            [logging.StreamHandler, logging.handlers.SysLogHandler]
+        )
+
+
+class TestDumps(unittest.TestCase):
+    """Tests for JSON serialization."""
+
+    DATA = {"updates": [{"name": "tzdata", "size_bytes": 1}], "total_updates": 1}
+
+    def test_json_fallback(self):
+        """Test serialization with the json module."""
+        with mock.patch.object(cli, "orjson", None):
+            self.assertEqual(cli._dumps(self.DATA), b'{"updates":[{"name":"tzdata","size_bytes":1}],"total_updates":1}')
+            self.assertEqual(cli._dumps(self.DATA, pretty=True), json.dumps(self.DATA, indent=2).encode())
+
+    @unittest.skipIf(cli.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        """Test that orjson produces the same output as the json fallback."""
+        with mock.patch.object(cli, "orjson", None):
+            compact = cli._dumps(self.DATA)
+            pretty = cli._dumps(self.DATA, pretty=True)
+
+        self.assertEqual(cli._dumps(self.DATA), compact)
+        self.assertEqual(cli._dumps(self.DATA, pretty=True), pretty)
+
+
+class TestSendToApi(unittest.TestCase):
+    """Tests for sending data to the API."""
+
+    def send(self, **request_kwargs):
+        """Call send_to_api against a stub connection pool."""
+        http = mock.Mock()
+        http.request.configure_mock(**request_kwargs)
+
+        with mock.patch.object(cli, "_get_http", return_value=http):
+            result = cli.send_to_api({"total_updates": 0, "updates": []}, "https://example.com/api/updates", "key")
+
+        return result, http
+
+    def test_success(self):
+        """Test that a 200 response succeeds and the request is built correctly."""
+        result, http = self.send(return_value=mock.Mock(status=200, data=b""))
+
+        self.assertTrue(result)
+        http.request.assert_called_once_with(
+            "POST",
+            "https://example.com/api/updates",
+            body=b'{"total_updates":0,"updates":[]}',
+            headers={"Content-Type": "application/json", "Authorization": "Bearer key"}
+        )
+
+    def test_error_status(self):
+        """Test that a non-200 response fails."""
+        with self.assertLogs(cli.logger, "ERROR"):
+            result, _ = self.send(return_value=mock.Mock(status=401, data=b"unauthorized"))
+
+        self.assertFalse(result)
+
+    def test_retries_exhausted(self):
+        """Test that connection errors are logged and reported as failure."""
+        error = urllib3.exceptions.MaxRetryError(None, "https://example.com/api/updates")
+
+        with self.assertLogs(cli.logger, "ERROR") as logs:
+            result, _ = self.send(side_effect=error)
+
+        self.assertFalse(result)
+        self.assertIn("Error sending data to API", logs.output[0])
+
+    def test_pool_is_shared(self):
+        """Test that the connection pool is created once."""
+        cli._get_http.cache_clear()
+        self.addCleanup(cli._get_http.cache_clear)
+
+        self.assertIs(cli._get_http(urllib3), cli._get_http(urllib3))
+
+
+class TestMain(unittest.TestCase):
+    """Tests for the main entry point."""
+
+    def run_main(self, *argv, updates=UPDATES):
+        """Run main() with the given arguments against a stub package manager."""
+        package_manager = mock.Mock()
+        package_manager.get_distribution_info.return_value = {"id": "ubuntu", "package_manager": "apt"}
+        package_manager.get_available_updates.return_value = [dict(update) for update in updates]
+        stdout = StdoutBuffer()
+
+        with mock.patch.object(sys, "argv", ["pmgmt-agent", "--config", "/nonexistent", *argv]), \
+                mock.patch.object(sys, "stdout", stdout), \
+                mock.patch.object(cli, "_configure_logging"), \
+                mock.patch.object(cli, "get_package_manager", return_value=package_manager) as get_pm, \
+                mock.patch.object(cli, "send_to_api", return_value=True) as send:
+            with self.assertRaises(SystemExit) as cm:
+                cli.main()
+
+        self.assertEqual(cm.exception.code, 0)
+        return get_pm, send, stdout.getvalue()
+
+    def test_details_default_for_stdout(self):
+        """Test that details are fetched by default for stdout output."""
+        get_pm, _, _ = self.run_main()
+        self.assertTrue(get_pm.call_args[1]["fetch_details"])
+
+    def test_details_default_for_api(self):
+        """Test that details are skipped by default for API payloads."""
+        get_pm, send, _ = self.run_main("--send-to-api", "--api-url", "https://example.com", "--api-key", "k")
+        self.assertFalse(get_pm.call_args[1]["fetch_details"])
+        send.assert_called_once()
+
+    def test_details_flags(self):
+        """Test that --details and --no-details override the default."""
+        get_pm, _, _ = self.run_main("--send-to-api", "--api-url", "https://example.com", "--api-key", "k",
+                                     "--details")
+        self.assertTrue(get_pm.call_args[1]["fetch_details"])
+
+        get_pm, _, _ = self.run_main("--no-details")
+        self.assertFalse(get_pm.call_args[1]["fetch_details"])
+
+    def test_compact_output(self):
+        """Test that stdout output is compact JSON by default."""
+        _, _, output = self.run_main()
+        self.assertTrue(output.endswith("\n"))
+        self.assertNotIn("\n", output.rstrip("\n"))
+        self.assertNotIn(": ", output)
+        self.assertEqual(json.loads(output)["total_updates"], 2)
+
+    def test_pretty_output(self):
+        """Test that --pretty indents the output."""
+        _, _, output = self.run_main("--pretty")
+        self.assertIn('\n  "hostname": ', output)
+        self.assertEqual(json.loads(output)["updates"][0]["name"], "libssl3")
+
+    def test_security_count(self):
+        """Test that security updates are counted."""
+        _, _, output = self.run_main()
+        self.assertEqual(json.loads(output)["security_updates"], 1)
+
+    def test_no_security(self):
+        """Test that --no-security disables the check and omits the count."""
+        get_pm, _, output = self.run_main("--no-security")
+        self.assertFalse(get_pm.call_args[1]["check_security"])
+        self.assertNotIn("security_updates", json.loads(output))
+
+
+if __name__ == "__main__":
+    unittest.main()
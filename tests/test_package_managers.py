@@ -0,0 +1,584 @@
+"""
+Tests for the package manager output parsers.
+"""
+
+import gzip
+import json
+import lzma
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from pmgmt_agent.package_managers import apt, dnf
+from pmgmt_agent.package_managers.base import run_lines
+
+
+APT_LIST_OUTPUT = """\
+Listing...
+libssl3/jammy-updates,jammy-security 3.0.2-0ubuntu1.10 amd64 [upgradable from: 3.0.2-0ubuntu1.9]
+tzdata/jammy-updates 2023c-0ubuntu0.22.04.2 all [upgradable from: 2023c-0ubuntu0.22.04.1]
+libc6/jammy-updates 2.35-0ubuntu3.4 i386 [upgradable from: 2.35-0ubuntu3.3]
+"""
+
+APT_CACHE_SHOW_OUTPUT = """\
+Package: libssl3
+Architecture: amd64
+Version: 3.0.2-0ubuntu1.10
+Priority: optional
+Section: libs
+Source: openssl
+Origin: Ubuntu
+Maintainer: Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>
+Installed-Size: 5980
+Depends: libc6 (>= 2.34)
+Filename: pool/main/o/openssl/libssl3_3.0.2-0ubuntu1.10_amd64.deb
+Size: 1905756
+Homepage: https://www.openssl.org/
+Description: Secure Sockets Layer toolkit - shared libraries
+ This package is part of the OpenSSL project's implementation of the SSL
+ and TLS cryptographic protocols for secure communication over the
+ Internet.
+Description-md5: 88547c6206c7fbc4fcc7d09ce100d210
+
+Package: libssl3
+Architecture: amd64
+Version: 3.0.2-0ubuntu1.9
+Priority: optional
+Section: libs
+Size: 1903112
+
+Package: tzdata
+Architecture: all
+Version: 2023c-0ubuntu0.22.04.2
+Priority: important
+Section: localization
+Size: unknown
+Description: time zone and daylight-saving time data
+
+"""
+
+APT_GET_SIMULATE_OUTPUT = """\
+Reading package lists...
+Building dependency tree...
+Calculating upgrade...
+The following packages will be upgraded:
+  libc6 libssl3 tzdata
+Inst libssl3 [3.0.2-0ubuntu1.9] (3.0.2-0ubuntu1.10 Ubuntu:22.04/jammy-updates, Ubuntu:22.04/jammy-security [amd64])
+Inst tzdata [2023c-0ubuntu0.22.04.1] (2023c-0ubuntu0.22.04.2 Ubuntu:22.04/jammy-updates [all])
+Inst libc6:i386 [2.35-0ubuntu3.3] (2.35-0ubuntu3.4 Ubuntu:22.04/jammy-security [i386]) []
+Inst linux-image-6.2.0-39-generic (6.2.0-39.40~22.04.1 Ubuntu:22.04/jammy-updates [amd64])
+Conf tzdata (2023c-0ubuntu0.22.04.2 Ubuntu:22.04/jammy-security [all])
+"""
+
+DNF_INFO_OUTPUT = """\
+Installed Packages
+Name         : openssl-libs
+Epoch        : 1
+Version      : 3.0.9
+Release      : 1.fc38
+Architecture : x86_64
+Size         : 6.3 M
+Source       : openssl-3.0.9-1.fc38.src.rpm
+Repository   : @System
+Summary      : A general purpose cryptography library with TLS implementation
+URL          : http://www.openssl.org/
+License      : ASL 2.0
+Description  : OpenSSL is a toolkit for supporting cryptography.
+             : The openssl-libs package contains the libraries.
+
+Available Upgrades
+Name         : openssl-libs
+Epoch        : 1
+Version      : 3.0.9
+Release      : 2.fc38
+Architecture : x86_64
+Size         : 2.1 M
+Source       : openssl-3.0.9-2.fc38.src.rpm
+Repository   : updates
+Summary      : A general purpose cryptography library with TLS implementation
+URL          : http://www.openssl.org/
+License      : Apache-2.0
+Description  : OpenSSL is a toolkit for supporting cryptography.
+             : The openssl-libs package contains the libraries.
+"""
+
+DNF_UPDATEINFO_OUTPUT = """\
+FEDORA-2023-1a2b3c4d5e Important/Sec.  openssl-libs-1:3.0.9-2.fc38.x86_64
+FEDORA-2023-9f8e7d6c5b Moderate/Sec.   python3-urllib3-1.26.18-1.fc38.noarch
+"""
+
+
+class TestAptPackageManager(unittest.TestCase):
+    """Tests for parsing APT command output."""
+
+    def setUp(self):
+        patcher = mock.patch.object(apt, "_import_python_apt", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_apt_list_line(self):
+        """Test that an apt list line is split into its fields."""
+        match = apt._APT_LINE_RE.match(APT_LIST_OUTPUT.splitlines()[1])
+        self.assertEqual(match["name"], "libssl3")
+        self.assertEqual(match["ver"], "3.0.2-0ubuntu1.10")
+        self.assertEqual(match["arch"], "amd64")
+        self.assertEqual(match["old"], "3.0.2-0ubuntu1.9")
+
+    def test_apt_list_other_lines(self):
+        """Test that the header and malformed lines don't match."""
+        for line in ["Listing...", "Listing... Done", "WARNING: apt does not have a stable CLI interface.",
+                     "libssl3/jammy-updates 3.0.2-0ubuntu1.10 amd64", ""]:
+            self.assertIsNone(apt._APT_LINE_RE.match(line), line)
+
+    def test_get_available_updates(self):
+        """Test that upgradable packages are merged with their details."""
+        show = subprocess.CompletedProcess([], 0, APT_CACHE_SHOW_OUTPUT, "")
+        manager = apt.AptPackageManager(fetch_details=True, check_security=False)
+
+        with mock.patch.object(apt, "run_lines", return_value=iter(APT_LIST_OUTPUT.splitlines(True))), \
+                mock.patch.object(apt.subprocess, "run", return_value=show) as run:
+            updates = manager.get_available_updates()
+
+        run.assert_called_once()
+        self.assertEqual([update["name"] for update in updates], ["libssl3", "tzdata", "libc6"])
+        self.assertEqual(updates[0]["current_version"], "3.0.2-0ubuntu1.9")
+        self.assertNotIn("is_security_update", updates[0])
+        self.assertEqual(updates[2]["architecture"], "i386")
+
+    def test_apt_list_timeout(self):
+        """Test that a timed out apt list yields no updates."""
+        manager = apt.AptPackageManager()
+        timeout = subprocess.TimeoutExpired(["apt"], apt.QUERY_TIMEOUT)
+
+        with mock.patch.object(apt, "run_lines", side_effect=timeout) as run_lines_mock:
+            self.assertEqual(manager.get_available_updates(), [])
+
+        self.assertEqual(run_lines_mock.call_args[1]["timeout"], apt.QUERY_TIMEOUT)
+
+    def test_package_details(self):
+        """Test that the first apt-cache show stanza of each package wins."""
+        show = subprocess.CompletedProcess([], 0, APT_CACHE_SHOW_OUTPUT, "")
+        manager = apt.AptPackageManager()
+
+        with mock.patch.object(apt.subprocess, "run", return_value=show):
+            details = manager._query_packages_details(["libssl3", "tzdata"])
+
+        self.assertEqual(details["libssl3"], {
+            "priority": "optional",
+            "section": "libs",
+            "maintainer": "Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>",
+            "size_bytes": 1905756,
+            "website": "https://www.openssl.org/",
+            "description": "Secure Sockets Layer toolkit - shared libraries",
+        })
+        self.assertEqual(details["tzdata"]["size"], "unknown")
+
+    def test_apt_field_re(self):
+        """Test that only whole reported fields match, not md5 or continuation lines."""
+        stanza = APT_CACHE_SHOW_OUTPUT.split("\n\n")[0]
+        fields = [match.group(1) for match in apt._APT_FIELD_RE.finditer(stanza)]
+        self.assertEqual(fields, ["Priority", "Section", "Maintainer", "Size", "Homepage", "Description"])
+
+    def test_package_details_single_call(self):
+        """Test that all packages are shown by one apt-cache call, even if some are unknown."""
+        show = subprocess.CompletedProcess([], 100, APT_CACHE_SHOW_OUTPUT, "N: Unable to locate package gone\n")
+        manager = apt.AptPackageManager()
+
+        with mock.patch.object(apt.subprocess, "run", return_value=show) as run, \
+                self.assertLogs(apt.logger, "WARNING"):
+            details = manager._query_packages_details(["libssl3", "tzdata", "gone"])
+
+        run.assert_called_once()
+        self.assertEqual(run.call_args[0][0], ["apt-cache", "show", "libssl3", "tzdata", "gone"])
+        self.assertEqual(sorted(details), ["libssl3", "tzdata"])
+
+    def test_results_are_memoized(self):
+        """Test that details and security results are queried once per instance."""
+        manager = apt.AptPackageManager()
+
+        with mock.patch.object(manager, "_query_packages_details", return_value={"libssl3": {}}) as query, \
+                mock.patch.object(manager, "_build_security_set", return_value={"libssl3"}) as build:
+            manager._get_packages_details(["libssl3"])
+            manager._get_packages_details(["libssl3", "tzdata"])
+            manager._get_security_updates()
+            manager._get_security_updates()
+
+        self.assertEqual(query.call_args_list, [mock.call(["libssl3"]), mock.call(["tzdata"])])
+        build.assert_called_once()
+
+    def test_build_security_set(self):
+        """Test that only Inst lines with a security origin are reported."""
+        manager = apt.AptPackageManager()
+
+        with mock.patch.object(apt, "run_lines", return_value=iter(APT_GET_SIMULATE_OUTPUT.splitlines(True))):
+            security_pkgs = manager._build_security_set()
+
+        self.assertEqual(security_pkgs, {"libssl3", "libc6"})
+
+    def test_build_security_set_includes_held(self):
+        """Test that held packages and phased updates are part of the simulation."""
+        manager = apt.AptPackageManager()
+        output = "Inst openssh-server [1:8.9p1-3ubuntu0.4] (1:8.9p1-3ubuntu0.6 Ubuntu:22.04/jammy-security [amd64])\n"
+
+        with mock.patch.object(apt, "run_lines", return_value=iter([output])) as run_lines_mock:
+            security_pkgs = manager._build_security_set()
+
+        cmd = run_lines_mock.call_args[0][0]
+        self.assertIn("APT::Ignore-Hold=true", cmd)
+        self.assertIn("APT::Get::Always-Include-Phased-Updates=true", cmd)
+        self.assertEqual(security_pkgs, {"openssh-server"})
+
+
+class TestAptCache(unittest.TestCase):
+    """Tests for reading updates from the python-apt cache."""
+
+    def make_manager(self, packages, **kwargs):
+        """Return an AptPackageManager reading from a stub python-apt cache."""
+        python_apt = types.SimpleNamespace(Cache=mock.Mock(return_value=packages))
+        with mock.patch.object(apt, "_import_python_apt", return_value=python_apt):
+            return apt.AptPackageManager(**kwargs)
+
+    def test_updates(self):
+        """Test that upgradable packages are read from the cache."""
+        candidate = types.SimpleNamespace(
+            version="3.0.2-0ubuntu1.10",
+            architecture="amd64",
+            origins=[types.SimpleNamespace(archive="jammy-updates"), types.SimpleNamespace(archive="jammy-security")],
+            size=1901458,
+            homepage="",
+            record={"Maintainer": "Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>"},
+            section="libs",
+            priority="optional",
+            summary="Secure Sockets Layer toolkit - shared libraries",
+        )
+        packages = [
+            types.SimpleNamespace(is_upgradable=True, shortname="libssl3", candidate=candidate,
+                                  installed=types.SimpleNamespace(version="3.0.2-0ubuntu1.9")),
+            types.SimpleNamespace(is_upgradable=False, shortname="bash"),
+        ]
+        manager = self.make_manager(packages, fetch_details=True)
+
+        with mock.patch.object(apt, "run_lines") as run:
+            updates = manager.get_available_updates()
+
+        run.assert_not_called()
+        self.assertEqual(updates, [{
+            "name": "libssl3",
+            "version": "3.0.2-0ubuntu1.10",
+            "current_version": "3.0.2-0ubuntu1.9",
+            "architecture": "amd64",
+            "is_security_update": True,
+            "size_bytes": 1901458,
+            "maintainer": "Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>",
+            "section": "libs",
+            "priority": "optional",
+            "description": "Secure Sockets Layer toolkit - shared libraries",
+        }])
+
+    def test_cache_error(self):
+        """Test that the commands are used when the cache cannot be opened."""
+        python_apt = types.SimpleNamespace(Cache=mock.Mock(side_effect=SystemError("E:Could not open lock file")))
+
+        with mock.patch.object(apt, "_import_python_apt", return_value=python_apt), \
+                self.assertLogs(apt.logger, "WARNING"):
+            manager = apt.AptPackageManager()
+
+        self.assertIsNone(manager._cache)
+
+
+class TestAptSecurityLists(unittest.TestCase):
+    """Tests for reading the security repository indexes."""
+
+    def write_list(self, tmpdir, name, opener, content):
+        """Write a Packages index file with the given opener."""
+        with opener(os.path.join(tmpdir, name), "wb") as f:
+            f.write(content)
+
+    def test_read_security_packages(self):
+        """Test that plain, gzip and xz security indexes are read and others ignored."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            prefix = "security.ubuntu.com_ubuntu_dists_jammy-security_"
+            self.write_list(tmpdir, prefix + "main_binary-amd64_Packages", open,
+                            b"Package: libssl3\nVersion: 3.0.2-0ubuntu1.10\n\nPackage: openssl\n")
+            self.write_list(tmpdir, prefix + "universe_binary-amd64_Packages.gz", gzip.open,
+                            b"Package: libxml2\nSource: libxml2\n")
+            self.write_list(tmpdir, prefix + "restricted_binary-amd64_Packages.xz", lzma.open,
+                            b"Package: nvidia-kernel-common\n")
+            self.write_list(tmpdir, prefix + "main_binary-amd64_Packages.diff_Index", open,
+                            b"Package: ignored-diff\n")
+            self.write_list(tmpdir, "archive.ubuntu.com_ubuntu_dists_jammy-updates_main_binary-amd64_Packages", open,
+                            b"Package: tzdata\n")
+
+            with mock.patch.object(apt, "APT_LISTS_DIR", tmpdir):
+                security_pkgs = apt._read_security_packages()
+
+        self.assertEqual(security_pkgs, {"libssl3", "openssl", "libxml2", "nvidia-kernel-common"})
+
+    def test_corrupt_index(self):
+        """Test that an unreadable compressed index is skipped."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.write_list(tmpdir, "security.debian.org_dists_bookworm-security_main_binary-amd64_Packages.gz",
+                            open, b"not gzip data")
+
+            with mock.patch.object(apt, "APT_LISTS_DIR", tmpdir), self.assertLogs(apt.logger, "WARNING"):
+                self.assertEqual(apt._read_security_packages(), set())
+
+
+class TestDnfPackageManager(unittest.TestCase):
+    """Tests for parsing DNF command output."""
+
+    def setUp(self):
+        patcher = mock.patch.object(dnf, "_import_dnf", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_available_updates(self):
+        """Test that details and security status are queried once for all updates."""
+        check_update = json.dumps({"updates": [
+            {"name": "openssl-libs", "version": "3.0.9", "release": "2.fc38", "arch": "x86_64", "repo": "updates",
+             "installed_version": "3.0.9"},
+            {"name": "openssl-libs", "version": "3.0.9", "release": "2.fc38", "arch": "i686", "repo": "updates",
+             "installed_version": "3.0.9"},
+            {"name": "tzdata", "version": "2023c", "release": "1.fc38", "arch": "noarch", "repo": "updates",
+             "installed_version": "2023b"},
+        ]})
+
+        def run(cmd, **kwargs):
+            output = check_update if "check-update" in cmd else DNF_UPDATEINFO_OUTPUT
+            return subprocess.CompletedProcess(cmd, 100 if "check-update" in cmd else 0, output, "")
+
+        manager = dnf.DnfPackageManager(fetch_details=True)
+
+        with mock.patch.object(dnf.subprocess, "run", side_effect=run) as run_mock, \
+                mock.patch.object(dnf, "run_lines", return_value=iter(DNF_INFO_OUTPUT.splitlines(True))) as info:
+            updates = manager.get_available_updates()
+
+        self.assertEqual(run_mock.call_count, 2)
+        info.assert_called_once()
+        self.assertEqual(info.call_args[0][0], ["dnf", "info", "--quiet", "openssl-libs", "tzdata"])
+        self.assertEqual([update["is_security_update"] for update in updates], [True, True, False])
+        self.assertEqual(updates[1]["license"], "Apache-2.0")
+
+    def test_package_details(self):
+        """Test that the available upgrade stanza takes precedence."""
+        manager = dnf.DnfPackageManager()
+
+        with mock.patch.object(dnf, "run_lines", return_value=iter(DNF_INFO_OUTPUT.splitlines(True))):
+            details = manager._query_packages_details(["openssl-libs"])
+
+        self.assertEqual(details, {
+            "openssl-libs": {
+                "size": "2.1 M",
+                "summary": "A general purpose cryptography library with TLS implementation",
+                "website": "http://www.openssl.org/",
+                "license": "Apache-2.0",
+                "description": "OpenSSL is a toolkit for supporting cryptography.",
+            }
+        })
+
+    def test_results_are_memoized(self):
+        """Test that details and security results are queried once per instance."""
+        manager = dnf.DnfPackageManager()
+
+        with mock.patch.object(manager, "_query_packages_details", return_value={"openssl-libs": {}}) as query, \
+                mock.patch.object(manager, "_query_security_updates", return_value={"openssl-libs"}) as security:
+            manager._get_packages_details(["openssl-libs"])
+            manager._get_packages_details(["openssl-libs"])
+            manager._get_security_updates()
+            manager._get_security_updates()
+
+        query.assert_called_once_with(["openssl-libs"])
+        security.assert_called_once()
+
+    def test_security_updates(self):
+        """Test that package names are extracted from updateinfo NEVRAs."""
+        result = subprocess.CompletedProcess([], 0, DNF_UPDATEINFO_OUTPUT, "")
+        manager = dnf.DnfPackageManager()
+
+        with mock.patch.object(dnf.subprocess, "run", return_value=result):
+            security_set = manager._query_security_updates()
+
+        self.assertEqual(security_set, {"openssl-libs", "python3-urllib3"})
+
+
+class FakeQuery:
+    """A minimal stand-in for a hawkey package query."""
+
+    def __init__(self, packages, advisory_pkgs=()):
+        self.packages = packages
+        self.advisory_pkgs = advisory_pkgs
+
+    def run(self):
+        return list(self.packages)
+
+    def filter(self, **kwargs):
+        return FakeQuery([pkg for pkg in self.packages
+                          if all(getattr(pkg, key) == value for key, value in kwargs.items())], self.advisory_pkgs)
+
+    def latest(self):
+        newest = {}
+        for pkg in self.packages:
+            key = (pkg.name, pkg.arch)
+            if key not in newest or (pkg.version, pkg.release) > (newest[key].version, newest[key].release):
+                newest[key] = pkg
+        return FakeQuery(list(newest.values()), self.advisory_pkgs)
+
+    def get_advisory_pkgs(self, cmp_type):
+        return list(self.advisory_pkgs)
+
+
+def fake_package(name, version, release, arch="x86_64", **attrs):
+    """Return a stand-in for a hawkey package."""
+    return types.SimpleNamespace(name=name, version=version, release=release, arch=arch, **attrs)
+
+
+class TestDnfApi(unittest.TestCase):
+    """Tests for querying updates through the dnf Python API."""
+
+    def setUp(self):
+        self.base = mock.MagicMock()
+        self.base.__enter__.return_value = self.base
+
+        installed = [
+            fake_package("openssl-libs", "3.0.7", "24.el9"),
+            fake_package("kernel", "5.14.0", "70.el9"),
+            fake_package("kernel", "5.14.1", "70.el9"),
+        ]
+        upgrades = [
+            fake_package("openssl-libs", "3.0.7", "25.el9", reponame="baseos", downloadsize=2202009,
+                         url="http://www.openssl.org/", license="Apache-2.0", summary="TLS library", description=""),
+            fake_package("kernel", "5.14.2", "70.el9", reponame="baseos", downloadsize=5347737,
+                         url="", license="GPLv2", summary="The Linux kernel", description=""),
+        ]
+        query = self.base.sack.query.return_value
+        advisory_pkgs = [
+            types.SimpleNamespace(name="openssl-libs", get_advisory=lambda sack: types.SimpleNamespace(type=2)),
+            types.SimpleNamespace(name="kernel", get_advisory=lambda sack: types.SimpleNamespace(type=1)),
+        ]
+        query.installed.return_value = FakeQuery(installed, advisory_pkgs)
+        query.upgrades.return_value = FakeQuery(upgrades)
+
+        python_dnf = types.SimpleNamespace(Base=mock.Mock(return_value=self.base))
+        dnf_format = types.SimpleNamespace(format_number=lambda number: "%.1f M" % (number / 1024 ** 2))
+        hawkey = types.SimpleNamespace(GT=1, ADVISORY_BUGFIX=1, ADVISORY_SECURITY=2)
+        modules = {"hawkey": hawkey, "dnf": python_dnf, "dnf.cli": types.SimpleNamespace(format=dnf_format),
+                   "dnf.cli.format": dnf_format}
+        patcher = mock.patch.dict(sys.modules, modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_updates(self):
+        """Test that updates are built from the package sack."""
+        manager = dnf.DnfPackageManager(fetch_details=True, check_security=False)
+        updates = manager._get_available_updates_from_api()
+
+        self.base.conf.read.assert_called_once()
+        self.assertEqual(updates, [
+            {
+                "name": "openssl-libs",
+                "version": "3.0.7",
+                "release": "25.el9",
+                "architecture": "x86_64",
+                "repository": "baseos",
+                "current_version": "3.0.7",
+                "size": "2.1 M",
+                "website": "http://www.openssl.org/",
+                "license": "Apache-2.0",
+                "summary": "TLS library",
+            },
+            {
+                "name": "kernel",
+                "version": "5.14.2",
+                "release": "70.el9",
+                "architecture": "x86_64",
+                "repository": "baseos",
+                # Newest of the installed kernels
+                "current_version": "5.14.1",
+                "size": "5.1 M",
+                "license": "GPLv2",
+                "summary": "The Linux kernel",
+            },
+        ])
+
+    def test_security_updates(self):
+        """Test that security status comes from the installed packages' advisories."""
+        manager = dnf.DnfPackageManager()
+        updates = manager._get_available_updates_from_api()
+
+        self.assertEqual([update["is_security_update"] for update in updates], [True, False])
+
+
+class TestQueryMetadata(unittest.TestCase):
+    """Tests for running the detail and security queries."""
+
+    def test_disabled_queries_are_skipped(self):
+        """Test that only enabled queries run."""
+        manager = dnf.DnfPackageManager(fetch_details=False, check_security=True)
+        get_details = mock.Mock(return_value={"a": {}})
+
+        details, security = manager._query_metadata(get_details, lambda: {"a"})
+
+        get_details.assert_not_called()
+        self.assertEqual((details, security), ({}, {"a"}))
+
+    def test_both_queries(self):
+        """Test that both results are returned when both queries are enabled."""
+        manager = dnf.DnfPackageManager(fetch_details=True, check_security=True)
+
+        details, security = manager._query_metadata(lambda: {"a": {"size": "1 k"}}, lambda: {"a"})
+
+        self.assertEqual((details, security), ({"a": {"size": "1 k"}}, {"a"}))
+
+
+class TestRunLines(unittest.TestCase):
+    """Tests for streaming command output."""
+
+    def test_lines(self):
+        """Test that output is yielded line by line."""
+        cmd = [sys.executable, "-c", "print('a'); print('b')"]
+        self.assertEqual(list(run_lines(cmd)), ["a\n", "b\n"])
+
+    def test_non_zero_exit(self):
+        """Test that a failing command raises after its output is read."""
+        cmd = [sys.executable, "-c", "print('a'); raise SystemExit(3)"]
+        lines = []
+
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            for line in run_lines(cmd):
+                lines.append(line)
+
+        self.assertEqual(cm.exception.returncode, 3)
+        self.assertEqual(lines, ["a\n"])
+
+    def test_timeout(self):
+        """Test that a command running past the timeout is killed."""
+        cmd = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            list(run_lines(cmd, timeout=0.2))
+
+    def test_stop_early(self):
+        """Test that closing the generator early kills the command."""
+        cmd = [sys.executable, "-c", "while True: print('y')"]
+        processes = []
+        popen = subprocess.Popen
+
+        def spawn(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+
+        with mock.patch.object(subprocess, "Popen", side_effect=spawn):
+            lines = run_lines(cmd)
+            self.assertEqual(next(lines), "y\n")
+            lines.close()
+
+        self.assertEqual(processes[0].returncode, -signal.SIGKILL)
+
+
+if __name__ == "__main__":
+    unittest.main()